@@ -0,0 +1,201 @@
+import argparse
+import base64
+import statistics
+import time
+from io import BytesIO
+
+from PIL import Image
+
+from generate import RESOLUTION_TIERS, QuizSession, fusion_api, generate_ai_question, generate_image_variants
+
+
+def fake_question_generator(latency):
+    counter = iter(range(1, 10 ** 9))
+
+    def generator(grade, subject):
+        time.sleep(latency)
+        return f"Вопрос {next(counter)}?_1_2_3_4_1"
+
+    return generator
+
+
+class CountingAPI:
+    def __init__(self, api):
+        self.api = api
+        self.jobs = 0
+
+    @property
+    def multi_image_supported(self):
+        return self.api.multi_image_supported
+
+    @multi_image_supported.setter
+    def multi_image_supported(self, value):
+        self.api.multi_image_supported = value
+
+    def generate(self, *args, **kwargs):
+        request_id = self.api.generate(*args, **kwargs)
+        # Отклонённые запросы заданием не считаем
+        if request_id:
+            self.jobs += 1
+        return request_id
+
+    def get_generated_images(self, request_id):
+        return self.api.get_generated_images(request_id)
+
+
+class FakeFusionAPI:
+    def __init__(self, latency, max_images):
+        self.latency = latency
+        self.max_images = max_images
+        self.multi_image_supported = None
+        self.jobs = {}
+
+    def generate(self, prompt, style="DEFAULT", width=1024, height=1024, negative_prompt=None, num_images=1):
+        # Как и настоящий пайплайн, отклоняем запрос на большее число изображений
+        if num_images > self.max_images:
+            self.multi_image_supported = False
+            return None
+        request_id = str(len(self.jobs))
+        self.jobs[request_id] = (width, height, num_images)
+        return request_id
+
+    def get_generated_images(self, request_id):
+        width, height, num_images = self.jobs[request_id]
+        # Время генерации примерно пропорционально числу пикселей во всех изображениях
+        time.sleep(self.latency * num_images * width * height / (1024 * 1024))
+        buffer = BytesIO()
+        Image.new('RGB', (width, height), 'white').save(buffer, format='PNG')
+        return [base64.b64encode(buffer.getvalue()).decode()] * num_images
+
+
+def report(title, waits):
+    print(title)
+    for number, wait in enumerate(waits, 1):
+        print(f"  вопрос {number}: {wait * 1000:.0f} мс")
+    if len(waits) > 1:
+        print(f"  медиана после первого вопроса: {statistics.median(waits[1:]) * 1000:.0f} мс")
+
+
+def bench_quiz(args):
+    generator = fake_question_generator(args.fake_latency) if args.fake_latency else generate_ai_question
+
+    # Прежняя схема: каждый вопрос генерируется только после ответа на предыдущий
+    sequential = []
+    for _ in range(args.questions):
+        started = time.perf_counter()
+        generator(args.grade, args.subject)
+        sequential.append(time.perf_counter() - started)
+        time.sleep(args.think)
+
+    # Конвейер: следующий вопрос готовится, пока ученик думает над текущим
+    pipelined = []
+    session = QuizSession(args.grade, args.subject, total=args.questions, generator=generator)
+    for _ in range(args.questions):
+        started = time.perf_counter()
+        if not session.next_question():
+            break
+        pipelined.append(time.perf_counter() - started)
+        session.prefetch()
+        time.sleep(args.think)
+
+    report("Последовательная генерация (ожидание ученика):", sequential)
+    report("Фоновая генерация (ожидание ученика):", pipelined)
+
+
+def bench_variants(args):
+    api = FakeFusionAPI(args.fake_latency, args.fake_max_images) if args.fake_latency else fusion_api
+
+    single_api = CountingAPI(api)
+    started = time.perf_counter()
+    generate_image_variants(args.prompt, count=1, api=single_api)
+    single_latency = time.perf_counter() - started
+
+    variants_api = CountingAPI(api)
+    started = time.perf_counter()
+    images = generate_image_variants(args.prompt, count=args.variants, api=variants_api)
+    variants_latency = time.perf_counter() - started
+
+    # Вероятность, что ученику понравится хотя бы одно изображение из запуска
+    p_single = args.accept_rate
+    p_variants = 1 - (1 - args.accept_rate) ** len(images)
+
+    print(f"Доля подходящих изображений: {args.accept_rate:.0%}")
+    print("Последовательные повторы по одному изображению:")
+    print(f"  запуск: {single_latency:.1f} с, заданий: {single_api.jobs}")
+    print(f"  заданий на довольного ученика: {single_api.jobs / p_single:.2f}")
+    print(f"  ожидаемое время до результата: {single_latency / p_single:.1f} с")
+    print(f"Несколько вариантов ({len(images)} в альбоме):")
+    print(f"  запуск: {variants_latency:.1f} с, заданий: {variants_api.jobs}")
+    print(f"  заданий на довольного ученика: {variants_api.jobs / p_variants:.2f}")
+    print(f"  ожидаемое время до результата: {variants_latency / p_variants:.1f} с")
+
+
+def bench_tiers(args):
+    api = FakeFusionAPI(args.fake_latency, 1) if args.fake_latency else fusion_api
+    full_pixels = RESOLUTION_TIERS['full'][0] * RESOLUTION_TIERS['full'][1]
+
+    medians = {}
+    for tier, (width, height) in RESOLUTION_TIERS.items():
+        times = []
+        for _ in range(args.runs):
+            started = time.perf_counter()
+            try:
+                generate_image_variants(args.prompt, width=width, height=height, api=api)
+            except Exception as e:
+                print(f"  {tier}: ошибка генерации: {e}")
+                continue
+            times.append(time.perf_counter() - started)
+        if not times:
+            continue
+
+        medians[tier] = statistics.median(times)
+        print(f"{tier} {width}x{height}:")
+        print(f"  медиана: {medians[tier]:.1f} с ({len(times)} запусков)")
+        print(f"  заданий на изображение: 1, пикселей относительно полного качества: "
+              f"{width * height / full_pixels:.0%}")
+
+    if 'draft' in medians and 'full' in medians:
+        # Черновик всегда, полное качество - только когда ученик нажал кнопку
+        draft_first_jobs = 1 + args.upgrade_rate
+        print(f"Черновик по умолчанию (полное качество заказывают {args.upgrade_rate:.0%}):")
+        print(f"  до первого изображения: {medians['draft']:.1f} с вместо {medians['full']:.1f} с")
+        print(f"  заданий FusionBrain на запрос: {draft_first_jobs:.2f} вместо 1.00")
+        print(f"  суммарное время генерации на запрос: "
+              f"{medians['draft'] + args.upgrade_rate * medians['full']:.1f} с вместо {medians['full']:.1f} с")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Замеры задержек школьного помощника")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    quiz_parser = subparsers.add_parser('quiz', help="воспринимаемая задержка вопросов в тесте")
+    quiz_parser.add_argument('--grade', type=int, default=5)
+    quiz_parser.add_argument('--subject', default='математика')
+    quiz_parser.add_argument('--questions', type=int, default=5)
+    quiz_parser.add_argument('--think', type=float, default=10, help="время ответа ученика, с")
+    quiz_parser.add_argument('--fake-latency', type=float, default=0,
+                             help="вместо API имитировать генерацию с задержкой, с")
+    quiz_parser.set_defaults(func=bench_quiz)
+
+    variants_parser = subparsers.add_parser('variants', help="несколько вариантов против повторных запусков")
+    variants_parser.add_argument('--prompt', default='кот в космосе')
+    variants_parser.add_argument('--variants', type=int, default=3)
+    variants_parser.add_argument('--accept-rate', type=float, default=0.4,
+                                 help="доля изображений, которые устраивают ученика")
+    variants_parser.add_argument('--fake-latency', type=float, default=0,
+                                 help="вместо API имитировать генерацию с задержкой, с")
+    variants_parser.add_argument('--fake-max-images', type=int, default=1,
+                                 help="сколько изображений имитация принимает в одном задании")
+    variants_parser.set_defaults(func=bench_variants)
+
+    tiers_parser = subparsers.add_parser('tiers', help="время и стоимость черновика и полного качества")
+    tiers_parser.add_argument('--prompt', default='кот в космосе')
+    tiers_parser.add_argument('--runs', type=int, default=5)
+    tiers_parser.add_argument('--upgrade-rate', type=float, default=0.3,
+                              help="доля черновиков, для которых заказывают полное качество")
+    tiers_parser.add_argument('--fake-latency', type=float, default=0,
+                              help="вместо API имитировать генерацию 1024x1024 с задержкой, с")
+    tiers_parser.set_defaults(func=bench_tiers)
+
+    args = parser.parse_args()
+    args.func(args)
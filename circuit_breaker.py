@@ -0,0 +1,100 @@
+import threading
+import time
+from collections import Counter
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+_breakers = {}
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    def __init__(self, name, failure_threshold=3, slow_call_threshold=None, reset_timeout=60):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        # Слишком медленный ответ считается такой же ошибкой, как и исключение
+        self.slow_call_threshold = slow_call_threshold
+        self.reset_timeout = reset_timeout
+
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.changed_at = time.time()
+        self.transitions = Counter()
+
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+        _breakers[name] = self
+
+    def _set_state(self, state):
+        old_state, self.state = self.state, state
+        self.changed_at = time.time()
+        self.transitions[(old_state, state)] += 1
+        print(f"Circuit breaker '{self.name}': {old_state} -> {state}")
+
+    def is_open(self):
+        with self._lock:
+            return self.state == OPEN and time.time() - self.opened_at < self.reset_timeout
+
+    def allow_request(self):
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN:
+                if time.time() - self.opened_at < self.reset_timeout:
+                    return False
+                self._set_state(HALF_OPEN)
+            # В полуоткрытом состоянии пропускаем только один пробный запрос
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def record_success(self, latency=None):
+        if self.slow_call_threshold and latency is not None and latency > self.slow_call_threshold:
+            print(f"Circuit breaker '{self.name}': slow call ({latency:.1f} s)")
+            return self.record_failure()
+
+        with self._lock:
+            self._probe_in_flight = False
+            self.failures = 0
+            if self.state != CLOSED:
+                self._set_state(CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self._probe_in_flight = False
+            self.failures += 1
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+                self.opened_at = time.time()
+                self._set_state(OPEN)
+
+    def call(self, func, *args, check_latency=True, **kwargs):
+        if not self.allow_request():
+            raise CircuitOpenError(f"Сервис {self.name} временно недоступен")
+
+        started = time.time()
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            self.record_failure()
+            raise
+        self.record_success(time.time() - started if check_latency else None)
+        return result
+
+
+def get_health():
+    health = {}
+    for name, breaker in _breakers.items():
+        health[name] = {
+            'state': OPEN if breaker.is_open() else (HALF_OPEN if breaker.state != CLOSED else CLOSED),
+            'failures': breaker.failures,
+            'changed_at': breaker.changed_at,
+            'transitions': {f'{old}->{new}': count for (old, new), count in breaker.transitions.items()},
+        }
+    return health
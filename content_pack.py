@@ -0,0 +1,135 @@
+import hashlib
+import mmap
+import os
+import struct
+import time
+
+# Формат пакета (little-endian):
+#   заголовок: magic, версия формата, число записей, смещение индекса, время сборки
+#   данные:    [длина ключа u16][ключ utf-8][значение utf-8] ...
+#   индекс:    отсортированные записи [хеш ключа u64][смещение u64][длина u32]
+CONTENT_PACK_PATH = 'content_pack.bin'
+
+PACK_MAGIC = b'ATSP'
+PACK_FORMAT_VERSION = 1
+
+_HEADER = struct.Struct('<4sHHIQQ')
+_INDEX_ENTRY = struct.Struct('<QQI')
+_KEY_LEN = struct.Struct('<H')
+
+# Разделитель вопросов внутри одного набора
+QUESTION_SEPARATOR = '\x1e'
+
+
+def make_key(kind, *parts):
+    normalized = [str(part).strip().lower() for part in parts]
+    return '|'.join([kind] + normalized)
+
+
+def _key_hash(key):
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+class ContentPackWriter:
+    def __init__(self):
+        self.entries = {}
+
+    def add(self, kind, parts, value):
+        self.entries[make_key(kind, *parts)] = value
+
+    def write(self, path):
+        records = []
+        index = []
+        offset = _HEADER.size
+        for key, value in self.entries.items():
+            key_bytes = key.encode('utf-8')
+            record = _KEY_LEN.pack(len(key_bytes)) + key_bytes + value.encode('utf-8')
+            index.append((_key_hash(key), offset, len(record)))
+            records.append(record)
+            offset += len(record)
+        index.sort()
+
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(_HEADER.pack(PACK_MAGIC, PACK_FORMAT_VERSION, 0, len(index), offset, int(time.time())))
+            for record in records:
+                f.write(record)
+            for entry in index:
+                f.write(_INDEX_ENTRY.pack(*entry))
+        os.replace(tmp_path, path)
+        return len(index)
+
+
+class ContentPack:
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self._file.close()
+            raise
+
+        magic, version, _, count, index_offset, built_at = _HEADER.unpack_from(self._mm, 0)
+        if magic != PACK_MAGIC or version != PACK_FORMAT_VERSION:
+            self.close()
+            raise ValueError(f"Unsupported content pack: {path}")
+        if index_offset + count * _INDEX_ENTRY.size > len(self._mm):
+            self.close()
+            raise ValueError(f"Truncated content pack: {path}")
+
+        self.count = count
+        self.built_at = built_at
+        self._index_offset = index_offset
+
+    def _entry(self, i):
+        return _INDEX_ENTRY.unpack_from(self._mm, self._index_offset + i * _INDEX_ENTRY.size)
+
+    def _lower_bound(self, key_hash):
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._entry(mid)[0] < key_hash:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def get(self, kind, *parts):
+        key = make_key(kind, *parts)
+        key_hash = _key_hash(key)
+        key_bytes = key.encode('utf-8')
+
+        i = self._lower_bound(key_hash)
+        # Коллизии хешей возможны, поэтому сверяем сам ключ
+        while i < self.count:
+            entry_hash, offset, length = self._entry(i)
+            if entry_hash != key_hash:
+                break
+            (key_len,) = _KEY_LEN.unpack_from(self._mm, offset)
+            start = offset + _KEY_LEN.size
+            if self._mm[start:start + key_len] == key_bytes:
+                return self._mm[start + key_len:offset + length].decode('utf-8')
+            i += 1
+        return None
+
+    def close(self):
+        if getattr(self, '_mm', None) is not None:
+            self._mm.close()
+            self._mm = None
+        self._file.close()
+
+    def __len__(self):
+        return self.count
+
+
+def open_content_pack(path):
+    if not os.path.exists(path):
+        return None
+    try:
+        pack = ContentPack(path)
+        print(f"Content pack loaded: {path} ({len(pack)} entries)")
+        return pack
+    except Exception as e:
+        print(f"Content pack load error: {str(e)}")
+        return None
@@ -1,58 +1,30 @@
 import base64
 import json
+import random
 import re
+import secrets
+import statistics
 import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
 
 import requests
 import telebot
 from PIL import Image
-from openai import OpenAI
 from telebot import types
 
-from config import TELEGRAM_TOKEN, AI_TOKEN, FUSION_BRAIN_API_KEY, FUSION_BRAIN_SECRET_KEY
+from circuit_breaker import CLOSED, CircuitBreaker, CircuitOpenError, get_health
+from config import TELEGRAM_TOKEN, FUSION_BRAIN_API_KEY, FUSION_BRAIN_SECRET_KEY
+from content_pack import CONTENT_PACK_PATH, QUESTION_SEPARATOR, open_content_pack
+from school_ai import (
+    GRADE_SUBJECTS, request_ai_question, request_explanation, request_recommendations
+)
 
 bot = telebot.TeleBot(TELEGRAM_TOKEN)
 
-# Инициализация клиента OpenAI с правильными заголовками аутентификации
-ai_client = OpenAI(
-    base_url="https://openrouter.ai/api/v1",
-    api_key=AI_TOKEN,
-    default_headers={
-        "Authorization": f"Bearer {AI_TOKEN}",
-        "HTTP-Referer": "https://github.com/yourusername/school-helper-bot",
-        "X-Title": "School Quiz Bot",
-    }
-)
-
-GRADE_SUBJECTS = {
-    1: ["математика", "русский язык", "окружающий мир", "чтение", "рисование", "музыка", "технология", "физкультура"],
-    2: ["математика", "русский язык", "окружающий мир", "английский язык", "китайский язык", "чтение", "рисование",
-        "музыка", "технология", "физкультура"],
-    3: ["математика", "русский язык", "окружающий мир", "литературное чтение", "английский язык", "китайский язык",
-        "музыка", "ИЗО", "технология", "физкультура", "ОРКСЭ"],
-    4: ["математика", "русский язык", "окружающий мир", "литературное чтение", "английский язык", "китайский язык",
-        "музыка", "ИЗО", "технология", "физкультура", "ОРКСЭ", "информатика"],
-    5: ["математика", "русский язык", "история", "биология", "литература", "английский язык", "география",
-        "китайский язык", "музыка", "ИЗО", "технология", "физкультура", "обществознание"],
-    6: ["математика", "русский язык", "история", "биология", "литература", "английский язык", "география",
-        "китайский язык", "музыка", "ИЗО", "технология", "физкультура", "обществознание"],
-    7: ["математика", "физика", "химия", "биология", "литература", "русский язык", "геометрия", "английский язык",
-        "ОБЖ", "история", "география", "китайский язык", "информатика", "обществознание", "технология", "физкультура",
-        "ИЗО"],
-    8: ["математика", "физика", "химия", "биология", "литература", "русский язык", "геометрия", "английский язык",
-        "ОБЖ", "история", "география", "китайский язык", "информатика", "обществознание", "технология", "физкультура",
-        "черчение"],
-    9: ["математика", "физика", "химия", "биология", "информатика", "литература", "русский язык", "геометрия",
-        "английский язык", "ОБЖ", "история", "география", "китайский язык", "обществознание", "экономика", "право",
-        "астрономия"],
-    10: ["математика", "физика", "химия", "биология", "информатика", "обществознание", "литература", "русский язык",
-         "геометрия", "английский язык", "ОБЖ", "история", "география", "китайский язык", "экономика", "право",
-         "астрономия", "естествознание"],
-    11: ["математика", "физика", "химия", "биология", "информатика", "обществознание", "литература", "русский язык",
-         "геометрия", "английский язык", "ОБЖ", "история", "география", "китайский язык", "экономика", "право",
-         "астрономия", "естествознание", "МХК"]
-}
+# Защита от долгих ожиданий, когда FusionBrain не отвечает
+fusion_breaker = CircuitBreaker('FusionBrain', failure_threshold=3, slow_call_threshold=20, reset_timeout=120)
 
 
 class FusionBrainAPI:
@@ -63,16 +35,22 @@ class FusionBrainAPI:
             'X-Secret': f'Secret {FUSION_BRAIN_SECRET_KEY}',
         }
         self.MODEL_ID = self._get_model_id()
+        # None - ещё не проверяли, принимает ли пайплайн numImages > 1
+        self.multi_image_supported = None
         self.STYLES = self._get_available_styles()
         self.COOSHEN_ID = self._get_available_styles()
 
+    def _request(self, method, path, **kwargs):
+        response = requests.request(method, self.API_URL + path, headers=self.AUTH_HEADERS, **kwargs)
+        # Для автомата защиты сбоем считаются только ошибки сервера и превышение лимита,
+        # ошибки в самом запросе вызывающий код проверяет сам
+        if response.status_code >= 500 or response.status_code == 429:
+            response.raise_for_status()
+        return response
+
     def _get_model_id(self):
         try:
-            response = requests.get(
-                self.API_URL + 'pipelines',
-                headers=self.AUTH_HEADERS,
-                timeout=10
-            )
+            response = fusion_breaker.call(self._request, 'GET', 'pipelines', timeout=10)
             response.raise_for_status()
             data = response.json()
             return data[0]['id']
@@ -84,13 +62,17 @@ class FusionBrainAPI:
     def _get_available_styles():
         return ["DEFAULT", "UHD", "ANIME", "NEON", "DETAILED", "KANDINSKY", "3D_MODEL", "WATERCOLOR"]
 
-    def generate(self, prompt, style="DEFAULT", width=1024, height=1024, negative_prompt=None):
+    def generate(self, prompt, style="DEFAULT", width=1024, height=1024, negative_prompt=None, num_images=1):
         if not self.MODEL_ID:
+            self.MODEL_ID = self._get_model_id()
+        if not self.MODEL_ID:
+            return None
+        if num_images > 1 and self.multi_image_supported is False:
             return None
 
         params = {
             "type": "GENERATE",
-            "numImages": 1,
+            "numImages": num_images,
             "width": width,
             "height": height,
             "generateParams": {
@@ -110,38 +92,49 @@ class FusionBrainAPI:
         }
 
         try:
-            response = requests.post(
-                self.API_URL + 'pipeline/run',
-                headers=self.AUTH_HEADERS,
-                files=data,
-                timeout=30
-            )
+            response = fusion_breaker.call(self._request, 'POST', 'pipeline/run', files=data, timeout=30)
+            # Запоминаем отказ, только если сервис пожаловался именно на число изображений
+            if num_images > 1 and 400 <= response.status_code < 500 and 'numimages' in response.text.lower():
+                print(f"Pipeline rejected numImages={num_images}, falling back to single-image jobs")
+                self.multi_image_supported = False
+                return None
             response.raise_for_status()
             return response.json()['uuid']
+        except CircuitOpenError as e:
+            print(f"Generation skipped: {str(e)}")
+            return None
         except Exception as e:
             print(f"Generation error: {str(e)}")
             return None
 
     def check_generation_status(self, request_id, attempts=15, delay=10):
+        files = self.get_generated_images(request_id, attempts, delay)
+        return files[0] if files else None
+
+    def get_generated_images(self, request_id, attempts=15, delay=10):
         for _ in range(attempts):
             try:
-                response = requests.get(
-                    self.API_URL + 'pipeline/status/' + request_id,
-                    headers=self.AUTH_HEADERS,
-                    timeout=10
-                )
+                response = fusion_breaker.call(self._request, 'GET', 'pipeline/status/' + request_id, timeout=10)
+                response.raise_for_status()
                 data = response.json()
 
                 if data['status'] == 'DONE':
-                    return data['result']['files'][0] if data.get('result', {}).get('files') else None
+                    return data.get('result', {}).get('files') or None
                 elif data['status'] == 'FAIL':
                     print(f"Generation failed: {data.get('errorDescription', 'Unknown error')}")
                     return None
 
                 time.sleep(delay)
+            except CircuitOpenError as e:
+                print(f"Status check skipped: {str(e)}")
+                return None
             except Exception as e:
                 print(f"Status check error: {str(e)}")
                 time.sleep(delay)
+
+        # Сервис принимает задания, но не выполняет их - это такой же сбой
+        print(f"Generation {request_id} did not finish after {attempts} status checks")
+        fusion_breaker.record_failure()
         return None
 
 
@@ -151,6 +144,93 @@ except Exception as e:
     print(f"FusionBrainAPI init error: {str(e)}")
     fusion_api = None
 
+# Заранее сгенерированный контент (см. warmup.py)
+content_pack = open_content_pack(CONTENT_PACK_PATH)
+
+
+def image_service_available():
+    return fusion_api is not None and not fusion_breaker.is_open()
+
+
+# Количество вариантов изображения в режиме выбора
+VARIANTS_COUNT = 3
+PENDING_LIMIT = 256
+
+# Размеры изображения: быстрый черновик и полное качество
+RESOLUTION_TIERS = {
+    'draft': (512, 512),
+    'full': (1024, 1024),
+}
+
+image_executor = ThreadPoolExecutor(max_workers=4)
+
+# Отправленные варианты, из которых ученик ещё не выбрал
+pending_variants = OrderedDict()
+# Черновики, для которых можно заказать полное качество
+pending_renders = OrderedDict()
+# Время последних генераций для каждого размера
+render_times = {tier: deque(maxlen=100) for tier in RESOLUTION_TIERS}
+
+
+def remember(store, key, value, limit=PENDING_LIMIT):
+    store[key] = value
+    store.move_to_end(key)
+    while len(store) > limit:
+        store.popitem(last=False)
+
+
+def decode_image(image_data):
+    img = Image.open(BytesIO(base64.b64decode(image_data)))
+    img_byte_arr = BytesIO()
+    img.save(img_byte_arr, format='PNG')
+    img_byte_arr.seek(0)
+    return img_byte_arr
+
+
+def _generate_single_image(api, prompt, style, negative_prompt, width, height):
+    uuid = api.generate(prompt=prompt, style=style, width=width, height=height, negative_prompt=negative_prompt)
+    return api.get_generated_images(uuid) if uuid else None
+
+
+def generate_image_variants(prompt, style="DEFAULT", negative_prompt=None, count=1, width=1024, height=1024,
+                            api=None):
+    api = api or fusion_api
+
+    uuid = api.generate(
+        prompt=prompt,
+        style=style,
+        width=width,
+        height=height,
+        negative_prompt=negative_prompt,
+        num_images=count
+    )
+    if uuid:
+        files = api.get_generated_images(uuid)
+        if not files:
+            raise Exception("Генерация не завершена или произошла ошибка")
+        if len(files) < count:
+            # Задание выполнено, но изображений меньше - больше не просим несколько сразу
+            api.multi_image_supported = False
+    elif count > 1 and api.multi_image_supported is False:
+        files = []
+    else:
+        raise Exception("Не удалось начать генерацию")
+
+    # Пайплайн не умеет отдавать несколько изображений - добираем параллельными запусками
+    missing = count - len(files)
+    if missing > 0:
+        extra = image_executor.map(
+            lambda _: _generate_single_image(api, prompt, style, negative_prompt, width, height),
+            range(missing)
+        )
+        for extra_files in extra:
+            files.extend(extra_files or [])
+
+    if not files:
+        raise Exception("Генерация не завершена или произошла ошибка")
+
+    return list(image_executor.map(decode_image, files[:count]))
+
 
 def format_text(text):
     text = text.replace('###', '-')
@@ -161,43 +241,75 @@ def format_text(text):
 
 
 def generate_ai_question(grade, subject, max_attempts=5):
-    prompt = f"""
-    Сгенерируй вопрос для {grade} класса по предмету "{subject}" в формате:
-    "текствопроса_ответ1_ответ2_ответ3_ответ4_номерправильногоответа"
-
-    Правила:
-    1. Только 4 варианта ответа
-    2. Номер правильного ответа (1-4)
-    3. Разделяй части подчеркиванием
-    4. Без кавычек
-    5. Пример: Сколько будет 2+2?_4_5_6_7_1
-    """
-
-    for attempt in range(max_attempts):
-        try:
-            response = ai_client.chat.completions.create(
-                model="deepseek/deepseek-chat",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=1.5,
-                max_tokens=200
-            )
-            question_data = response.choices[0].message.content.strip()
-
-            if validate_question(question_data):
+    if content_pack:
+        questions = content_pack.get('questions', grade, subject)
+        if questions:
+            return random.choice(questions.split(QUESTION_SEPARATOR))
+
+    return request_ai_question(grade, subject, max_attempts)
+
+
+# Количество вопросов в одном тесте
+QUIZ_LENGTH = 5
+
+# Следующий вопрос генерируется в фоне, пока ученик отвечает на текущий
+question_executor = ThreadPoolExecutor(max_workers=4)
+
+
+class QuizSession:
+    __slots__ = ('grade', 'subject', 'total', 'number', 'score', 'asked', 'generator', '_next')
+
+    def __init__(self, grade, subject, total=QUIZ_LENGTH, generator=None):
+        self.grade = grade
+        self.subject = subject
+        self.total = total
+        self.number = 0
+        self.score = 0
+        self.asked = []
+        self.generator = generator or generate_ai_question
+        self._next = None
+
+    def _generate_unique(self, asked):
+        for _ in range(3):
+            question_data = self.generator(self.grade, self.subject)
+            if not question_data:
+                return None
+            if question_data not in asked:
                 return question_data
 
-        except Exception as e:
-            print(f"Question generation error (attempt {attempt + 1}): {e}")
-            if attempt == max_attempts - 1:
+        # Вопросы из пакета закончились - просим у модели новые
+        for _ in range(3):
+            question_data = request_ai_question(self.grade, self.subject)
+            if not question_data:
                 return None
+            if question_data not in asked:
+                return question_data
+        return None
 
-        time.sleep(1)
-    return None
+    def prefetch(self):
+        if self._next is None and self.number < self.total:
+            self._next = question_executor.submit(self._generate_unique, tuple(self.asked))
 
+    def next_question(self):
+        if self._next is not None:
+            future, self._next = self._next, None
+            try:
+                question_data = future.result()
+            except Exception as e:
+                print(f"Question prefetch error: {e}")
+                question_data = None
+        else:
+            question_data = self._generate_unique(self.asked)
+
+        if question_data:
+            self.number += 1
+            self.asked.append(question_data)
+        return question_data
 
-def validate_question(question):
-    parts = question.split('_')
-    return len(parts) == 6 and parts[5] in ['1', '2', '3', '4']
+    def cancel(self):
+        if self._next is not None:
+            self._next.cancel()
+            self._next = None
 
 
 def create_main_menu():
@@ -209,6 +321,8 @@ def create_main_menu():
         types.KeyboardButton('🧮 Калькулятор'),
         types.KeyboardButton('ℹ️ О боте')
     ]
+    if not image_service_available():
+        buttons = [button for button in buttons if button.text != '🎨 Генерация изображений']
     markup.add(*buttons)
     return markup
 
@@ -219,28 +333,26 @@ def add_back_button(markup):
 
 
 def generate_recommendations(topic):
-    prompt = f"""
-    На основе темы "{topic}" сгенерируй 2 рекомендации для дальнейшего изучения.
-    Формат: перваярекомендация_втораярекомендация
-    Без кавычек, разделяй подчеркиванием.
-    Пример: тебе до этого задали Дроби как тему и ты должен в своем сообщении написать "Что такое знаменатель_Десятичные дроби"
-    """
-
-    try:
-        response = ai_client.chat.completions.create(
-            model="deepseek/deepseek-chat",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.7,
-            max_tokens=200
-        )
-        recommendations = response.choices[0].message.content.strip()
-        if '_' in recommendations and len(recommendations.split('_')) == 2:
+    if content_pack:
+        recommendations = content_pack.get('recommendations', topic)
+        if recommendations:
             return recommendations
-    except Exception as e:
-        print(f"Recommendation generation error: {e}")
+
+    recommendations = request_recommendations(topic)
+    if recommendations:
+        return recommendations
     return "узнать больше по этой теме_изучить смежные темы"
 
 
+def generate_explanation(topic, grade=None):
+    if content_pack:
+        explanation = content_pack.get('explanation', grade or 0, topic)
+        if explanation:
+            return explanation
+
+    return request_explanation(topic, grade)
+
+
 @bot.message_handler(commands=['start', 'help'])
 def send_welcome(message):
     try:
@@ -268,6 +380,25 @@ def send_welcome(message):
     )
 
 
+@bot.message_handler(commands=['status'])
+def service_status(message):
+    lines = ["📡 Состояние сервисов:"]
+    for name, info in get_health().items():
+        mark = '✅' if info['state'] == CLOSED else '⚠️'
+        lines.append(f"{mark} {name}: {info['state']}")
+
+    for tier, times in render_times.items():
+        if times:
+            width, height = RESOLUTION_TIERS[tier]
+            lines.append(f"⏱ {tier} {width}x{height}: медиана {statistics.median(times):.0f} с ({len(times)} шт.)")
+
+    bot.send_message(
+        message.chat.id,
+        '\n'.join(lines),
+        reply_markup=create_main_menu()
+    )
+
+
 @bot.message_handler(func=lambda m: m.text == 'ℹ️ О боте')
 def about_bot(message):
     try:
@@ -339,22 +470,28 @@ def handle_subject(message, grade):
 
     bot.send_message(message.chat.id, "🔄 Генерирую вопрос...")
 
-    question_data = generate_ai_question(grade, subject)
+    session = QuizSession(grade, subject)
+    question_data = session.next_question()
     if not question_data:
         bot.send_message(message.chat.id, "❌ Не удалось сгенерировать вопрос. Попробуй позже.")
         return send_welcome(message)
 
+    ask_quiz_question(message, session, question_data)
+
+
+def ask_quiz_question(message, session, question_data):
     parts = question_data.split('_')
     question = parts[0]
     answers = parts[1:5]
     correct_num = int(parts[5]) - 1
 
+    session.prefetch()
+
     bot.register_next_step_handler(
         message,
         check_answer,
-        correct=answers[correct_num],
-        subject=subject,
-        grade=grade
+        session=session,
+        correct=answers[correct_num]
     )
 
     markup = types.ReplyKeyboardMarkup(resize_keyboard=True)
@@ -364,22 +501,45 @@ def handle_subject(message, grade):
 
     bot.send_message(
         message.chat.id,
-        f"❓ Вопрос ({subject}, {grade} класс):\n\n{question}",
+        f"❓ Вопрос {session.number}/{session.total} ({session.subject}, {session.grade} класс):\n\n{question}",
         reply_markup=markup
     )
 
 
-def check_answer(message, correct, subject, grade):
+def check_answer(message, session, correct):
     if message.text == '🔙 На главную':
+        session.cancel()
         return send_welcome(message)
 
     if message.text == correct:
+        session.score += 1
         reply = "✅ Правильно! Молодец!"
     else:
         reply = f"❌ Неверно! Правильный ответ: {correct}"
 
     bot.send_message(message.chat.id, reply)
 
+    if session.number < session.total:
+        question_data = session.next_question()
+        if not question_data:
+            # Фоновая генерация не удалась - пробуем ещё раз, уже с ожиданием
+            bot.send_message(message.chat.id, "🔄 Генерирую вопрос...")
+            question_data = session.next_question()
+        if question_data:
+            return ask_quiz_question(message, session, question_data)
+
+        bot.send_message(
+            message.chat.id,
+            f"⚠️ Не удалось сгенерировать вопрос {session.number + 1}, поэтому тест завершён досрочно."
+        )
+
+    bot.send_message(
+        message.chat.id,
+        f"🏁 Тест завершён! Правильных ответов: {session.score} из {session.number}"
+    )
+
+    subject = session.subject
+    grade = session.grade
     recommendations = generate_recommendations(subject)
     rec1, rec2 = recommendations.split('_')
 
@@ -421,20 +581,7 @@ def handle_recommendation(message, subject, grade, prev_recommendations=None):
     bot.send_message(message.chat.id, f"🔄 Готовлю информацию по теме: {topic}...")
 
     try:
-        response = ai_client.chat.completions.create(
-            model="deepseek/deepseek-chat",
-            messages=[{
-                "role": "system",
-                "content": "Ты - учитель для школьников. Объясняй просто и понятно, с примерами."
-            }, {
-                "role": "user",
-                "content": f"Объясни тему '{topic}' для школьника {grade} класса"
-            }],
-            temperature=0.7,
-            max_tokens=1500
-        )
-
-        explanation = format_text(response.choices[0].message.content)
+        explanation = format_text(generate_explanation(topic, grade))
 
         if len(explanation) > 4000:
             for x in range(0, len(explanation), 4000):
@@ -485,20 +632,7 @@ def explain_topic(message):
     bot.send_message(message.chat.id, f"🔄 Ищу информацию по теме '{topic}'...")
 
     try:
-        response = ai_client.chat.completions.create(
-            model="deepseek/deepseek-chat",
-            messages=[{
-                "role": "system",
-                "content": "Ты - учитель для школьников. Объясняй просто и понятно, с примерами."
-            }, {
-                "role": "user",
-                "content": f"Объясни тему '{topic}' для школьника"
-            }],
-            temperature=0.7,
-            max_tokens=1500
-        )
-
-        explanation = format_text(response.choices[0].message.content)
+        explanation = format_text(generate_explanation(topic))
 
         if len(explanation) > 4000:
             for x in range(0, len(explanation), 4000):
@@ -535,7 +669,7 @@ def explain_topic(message):
 
 @bot.message_handler(func=lambda m: m.text == '🎨 Генерация изображений')
 def start_image_generation(message):
-    if not fusion_api:
+    if not image_service_available():
         bot.send_message(message.chat.id, "❌ Сервис генерации изображений временно недоступен")
         return send_welcome(message)
 
@@ -543,6 +677,7 @@ def start_image_generation(message):
     buttons = [
         types.KeyboardButton('🖼️ Обычное изображение'),
         types.KeyboardButton('✏️ Контурный рисунок'),
+        types.KeyboardButton('🎲 Несколько вариантов'),
         types.KeyboardButton('🌈 Выбрать стиль')
     ]
     markup.add(*buttons)
@@ -557,7 +692,7 @@ def start_image_generation(message):
 
 @bot.message_handler(func=lambda m: m.text == '🌈 Выбрать стиль')
 def choose_style(message):
-    if not fusion_api:
+    if not image_service_available():
         bot.send_message(message.chat.id, "❌ Сервис генерации изображений временно недоступен")
         return send_welcome(message)
 
@@ -594,13 +729,17 @@ def process_style_selection(message):
     bot.register_next_step_handler(message, process_image_generation)
 
 
-@bot.message_handler(func=lambda m: m.text in ['🖼️ Обычное изображение', '✏️ Контурный рисунок'])
+@bot.message_handler(func=lambda m: m.text in ['🖼️ Обычное изображение', '✏️ Контурный рисунок', '🎲 Несколько вариантов'])
 def handle_image_type(message):
-    if not fusion_api:
+    if not image_service_available():
         bot.send_message(message.chat.id, "❌ Сервис генерации изображений временно недоступен")
         return send_welcome(message)
 
-    image_type = 'standard' if message.text == '🖼️ Обычное изображение' else 'contour'
+    image_type = {
+        '🖼️ Обычное изображение': 'standard',
+        '✏️ Контурный рисунок': 'contour',
+        '🎲 Несколько вариантов': 'variants'
+    }[message.text]
 
     if not hasattr(bot, 'session_data'):
         bot.session_data = {}
@@ -610,6 +749,8 @@ def handle_image_type(message):
     if image_type == 'contour':
         bot.session_data[message.chat.id]['style'] = 'DEFAULT'
         bot.session_data[message.chat.id]['negative_prompt'] = "цвета, заливка, тени, градиенты"
+    elif image_type == 'variants':
+        bot.session_data[message.chat.id]['variants'] = VARIANTS_COUNT
 
     bot.send_message(
         message.chat.id,
@@ -623,7 +764,7 @@ def process_image_generation(message):
     if message.text == '🔙 На главную':
         return send_welcome(message)
 
-    if not fusion_api:
+    if not image_service_available():
         bot.send_message(message.chat.id, "❌ Сервис генерации изображений временно недоступен")
         return send_welcome(message)
 
@@ -638,31 +779,28 @@ def process_image_generation(message):
     if chat_data.get('image_type') == 'contour':
         prompt = f"контурный рисунок {prompt}, черно-белый, без заливки, только линии, с низкой детализацией, МАКСИМАЛЬНО светлый рисунок, без заливки-"
 
-    bot.send_message(message.chat.id, "🔄 Генерирую изображение... Это может занять до 2 минут.")
+    variants = chat_data.get('variants', 1)
+    # Одиночные изображения сначала рисуем черновиком, полное качество - по кнопке
+    tier = 'full' if variants > 1 else 'draft'
 
-    try:
-        uuid = fusion_api.generate(
-            prompt=prompt,
-            style=style,
-            negative_prompt=negative_prompt
-        )
-
-        if not uuid:
-            raise Exception("Не удалось начать генерацию")
-
-        image_data = fusion_api.check_generation_status(uuid)
+    if message.chat.id in bot.session_data:
+        del bot.session_data[message.chat.id]
 
-        if not image_data:
-            raise Exception("Генерация не завершена или произошла ошибка")
+    if variants > 1:
+        bot.send_message(message.chat.id, f"🔄 Генерирую {variants} варианта изображения... Это может занять до 2 минут.")
+    else:
+        bot.send_message(message.chat.id, "🔄 Генерирую черновик изображения...")
 
-        image_bytes = base64.b64decode(image_data)
-        img = Image.open(BytesIO(image_bytes))
+    try:
+        width, height = RESOLUTION_TIERS[tier]
+        started = time.time()
+        images = generate_image_variants(prompt, style, negative_prompt, count=variants, width=width, height=height)
+        render_times[tier].append(time.time() - started)
 
-        img_byte_arr = BytesIO()
-        img.save(img_byte_arr, format='PNG')
-        img_byte_arr.seek(0)
+        if len(images) > 1:
+            return send_image_variants(message, images)
 
-        bot.send_photo(message.chat.id, img_byte_arr)
+        send_draft(message.chat.id, images[0], (prompt, style, negative_prompt))
         bot.send_message(
             message.chat.id,
             "✅ Изображение готово!",
@@ -680,8 +818,84 @@ def process_image_generation(message):
             reply_markup=create_main_menu()
         )
 
-    if message.chat.id in bot.session_data:
-        del bot.session_data[message.chat.id]
+
+def send_draft(chat_id, photo, render):
+    # Случайный токен не совпадёт с кнопками, оставшимися от прошлого запуска бота
+    token = secrets.token_hex(8)
+    remember(pending_renders, token, {'chat_id': chat_id, 'render': render})
+
+    markup = types.InlineKeyboardMarkup()
+    markup.add(types.InlineKeyboardButton('🔍 Полное качество', callback_data=f"full:{token}"))
+    return bot.send_photo(chat_id, photo, caption="Черновик", reply_markup=markup)
+
+
+@bot.callback_query_handler(func=lambda call: call.data.startswith('full:'))
+def render_full_quality(call):
+    token = call.data.split(':')[1]
+    pending = pending_renders.pop(token, None)
+    if pending and pending['chat_id'] != call.message.chat.id:
+        remember(pending_renders, token, pending)
+        pending = None
+    if not pending:
+        return bot.answer_callback_query(call.id, "Этот черновик уже недоступен")
+
+    if not image_service_available():
+        remember(pending_renders, token, pending)
+        return bot.answer_callback_query(call.id, "❌ Сервис генерации изображений временно недоступен")
+
+    chat_id = call.message.chat.id
+    draft_id = call.message.message_id
+    bot.answer_callback_query(call.id)
+
+    prompt, style, negative_prompt = pending['render']
+    bot.send_message(chat_id, "🔄 Генерирую изображение в полном качестве... Это может занять до 2 минут.")
+
+    try:
+        width, height = RESOLUTION_TIERS['full']
+        started = time.time()
+        images = generate_image_variants(prompt, style, negative_prompt, width=width, height=height)
+        render_times['full'].append(time.time() - started)
+
+        bot.send_photo(chat_id, images[0], reply_to_message_id=draft_id)
+    except Exception as e:
+        # Кнопка под черновиком остаётся, можно попробовать ещё раз
+        remember(pending_renders, token, pending)
+        bot.send_message(chat_id, f"❌ Ошибка при генерации изображения: {str(e)}")
+        return
+
+    bot.edit_message_reply_markup(chat_id, draft_id, reply_markup=None)
+
+
+def send_image_variants(message, images):
+    album = bot.send_media_group(message.chat.id, [types.InputMediaPhoto(image) for image in images])
+    file_ids = [sent.photo[-1].file_id for sent in album]
+
+    token = f"{message.chat.id}_{message.message_id}"
+    remember(pending_variants, token, {'file_ids': file_ids, 'started': time.time()})
+
+    markup = types.InlineKeyboardMarkup(row_width=len(file_ids))
+    markup.add(*[
+        types.InlineKeyboardButton(f"✅ {i + 1}", callback_data=f"variant:{token}:{i}")
+        for i in range(len(file_ids))
+    ])
+    bot.send_message(message.chat.id, "🎲 Какой вариант оставить?", reply_markup=markup)
+    bot.send_message(message.chat.id, "✅ Изображения готовы!", reply_markup=create_main_menu())
+
+
+@bot.callback_query_handler(func=lambda call: call.data.startswith('variant:'))
+def select_image_variant(call):
+    _, token, index = call.data.split(':')
+    variants = pending_variants.pop(token, None)
+    if not variants:
+        return bot.answer_callback_query(call.id, "Этот выбор уже недоступен")
+
+    file_id = variants['file_ids'][int(index)]
+    print(f"Image variant selected: {int(index) + 1}/{len(variants['file_ids'])} "
+          f"after {time.time() - variants['started']:.0f} s")
+
+    bot.answer_callback_query(call.id)
+    bot.edit_message_reply_markup(call.message.chat.id, call.message.message_id, reply_markup=None)
+    bot.send_photo(call.message.chat.id, file_id, caption=f"✅ Вариант {int(index) + 1}")
 
 
 @bot.message_handler(func=lambda m: m.text == '🧮 Калькулятор')
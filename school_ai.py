@@ -0,0 +1,152 @@
+import time
+
+from openai import OpenAI
+
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from config import AI_TOKEN
+
+# Инициализация клиента OpenAI с правильными заголовками аутентификации
+ai_client = OpenAI(
+    base_url="https://openrouter.ai/api/v1",
+    api_key=AI_TOKEN,
+    default_headers={
+        "Authorization": f"Bearer {AI_TOKEN}",
+        "HTTP-Referer": "https://github.com/yourusername/school-helper-bot",
+        "X-Title": "School Quiz Bot",
+    },
+    # Длинные объяснения (до 1500 токенов) генерируются заметно дольше коротких ответов
+    timeout=180,
+    # Повторы делают автомат защиты и цикл попыток, иначе одна ошибка растягивается в несколько таймаутов
+    max_retries=0
+)
+
+# Короткие запросы (вопросы и рекомендации) должны укладываться в эти значения
+SHORT_REQUEST_TIMEOUT = 30
+SLOW_SHORT_REQUEST = 20
+
+# Защита от долгих ожиданий, когда OpenRouter не отвечает.
+# По задержке размыкаем только на коротких запросах, объяснения учитываются лишь по ошибкам
+openrouter_breaker = CircuitBreaker('OpenRouter', failure_threshold=3, slow_call_threshold=SLOW_SHORT_REQUEST,
+                                    reset_timeout=60)
+
+GRADE_SUBJECTS = {
+    1: ["математика", "русский язык", "окружающий мир", "чтение", "рисование", "музыка", "технология", "физкультура"],
+    2: ["математика", "русский язык", "окружающий мир", "английский язык", "китайский язык", "чтение", "рисование",
+        "музыка", "технология", "физкультура"],
+    3: ["математика", "русский язык", "окружающий мир", "литературное чтение", "английский язык", "китайский язык",
+        "музыка", "ИЗО", "технология", "физкультура", "ОРКСЭ"],
+    4: ["математика", "русский язык", "окружающий мир", "литературное чтение", "английский язык", "китайский язык",
+        "музыка", "ИЗО", "технология", "физкультура", "ОРКСЭ", "информатика"],
+    5: ["математика", "русский язык", "история", "биология", "литература", "английский язык", "география",
+        "китайский язык", "музыка", "ИЗО", "технология", "физкультура", "обществознание"],
+    6: ["математика", "русский язык", "история", "биология", "литература", "английский язык", "география",
+        "китайский язык", "музыка", "ИЗО", "технология", "физкультура", "обществознание"],
+    7: ["математика", "физика", "химия", "биология", "литература", "русский язык", "геометрия", "английский язык",
+        "ОБЖ", "история", "география", "китайский язык", "информатика", "обществознание", "технология", "физкультура",
+        "ИЗО"],
+    8: ["математика", "физика", "химия", "биология", "литература", "русский язык", "геометрия", "английский язык",
+        "ОБЖ", "история", "география", "китайский язык", "информатика", "обществознание", "технология", "физкультура",
+        "черчение"],
+    9: ["математика", "физика", "химия", "биология", "информатика", "литература", "русский язык", "геометрия",
+        "английский язык", "ОБЖ", "история", "география", "китайский язык", "обществознание", "экономика", "право",
+        "астрономия"],
+    10: ["математика", "физика", "химия", "биология", "информатика", "обществознание", "литература", "русский язык",
+         "геометрия", "английский язык", "ОБЖ", "история", "география", "китайский язык", "экономика", "право",
+         "астрономия", "естествознание"],
+    11: ["математика", "физика", "химия", "биология", "информатика", "обществознание", "литература", "русский язык",
+         "геометрия", "английский язык", "ОБЖ", "история", "география", "китайский язык", "экономика", "право",
+         "астрономия", "естествознание", "МХК"]
+}
+
+
+def request_ai_question(grade, subject, max_attempts=5, breaker=openrouter_breaker):
+    prompt = f"""
+    Сгенерируй вопрос для {grade} класса по предмету "{subject}" в формате:
+    "текствопроса_ответ1_ответ2_ответ3_ответ4_номерправильногоответа"
+
+    Правила:
+    1. Только 4 варианта ответа
+    2. Номер правильного ответа (1-4)
+    3. Разделяй части подчеркиванием
+    4. Без кавычек
+    5. Пример: Сколько будет 2+2?_4_5_6_7_1
+    """
+
+    for attempt in range(max_attempts):
+        try:
+            response = breaker.call(
+                ai_client.chat.completions.create,
+                model="deepseek/deepseek-chat",
+                messages=[{"role": "user", "content": prompt}],
+                temperature=1.5,
+                max_tokens=200,
+                timeout=SHORT_REQUEST_TIMEOUT
+            )
+            question_data = response.choices[0].message.content.strip()
+
+            if validate_question(question_data):
+                return question_data
+
+        except CircuitOpenError as e:
+            print(f"Question generation skipped: {e}")
+            return None
+        except Exception as e:
+            print(f"Question generation error (attempt {attempt + 1}): {e}")
+            if attempt == max_attempts - 1:
+                return None
+
+        time.sleep(1)
+    return None
+
+
+def validate_question(question):
+    parts = question.split('_')
+    return len(parts) == 6 and parts[5] in ['1', '2', '3', '4']
+
+
+def request_recommendations(topic, breaker=openrouter_breaker):
+    prompt = f"""
+    На основе темы "{topic}" сгенерируй 2 рекомендации для дальнейшего изучения.
+    Формат: перваярекомендация_втораярекомендация
+    Без кавычек, разделяй подчеркиванием.
+    Пример: тебе до этого задали Дроби как тему и ты должен в своем сообщении написать "Что такое знаменатель_Десятичные дроби"
+    """
+
+    try:
+        response = breaker.call(
+            ai_client.chat.completions.create,
+            model="deepseek/deepseek-chat",
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.7,
+            max_tokens=200,
+            timeout=SHORT_REQUEST_TIMEOUT
+        )
+        recommendations = response.choices[0].message.content.strip()
+        if '_' in recommendations and len(recommendations.split('_')) == 2:
+            return recommendations
+    except Exception as e:
+        print(f"Recommendation generation error: {e}")
+    return None
+
+
+def request_explanation(topic, grade=None, breaker=openrouter_breaker):
+    if grade:
+        request = f"Объясни тему '{topic}' для школьника {grade} класса"
+    else:
+        request = f"Объясни тему '{topic}' для школьника"
+
+    response = breaker.call(
+        ai_client.chat.completions.create,
+        check_latency=False,
+        model="deepseek/deepseek-chat",
+        messages=[{
+            "role": "system",
+            "content": "Ты - учитель для школьников. Объясняй просто и понятно, с примерами."
+        }, {
+            "role": "user",
+            "content": request
+        }],
+        temperature=0.7,
+        max_tokens=1500
+    )
+    return response.choices[0].message.content
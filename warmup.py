@@ -0,0 +1,165 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from circuit_breaker import CircuitBreaker
+from content_pack import CONTENT_PACK_PATH, QUESTION_SEPARATOR, ContentPackWriter, make_key
+from school_ai import GRADE_SUBJECTS, request_ai_question, request_explanation, request_recommendations
+
+CHECKPOINT_PATH = 'warmup_checkpoint.jsonl'
+
+# Пакетному заданию задержка не важна: размыкаем только на ошибках и ждём, пока сервис вернётся
+warmup_breaker = CircuitBreaker('OpenRouter (warm-up)', failure_threshold=5, reset_timeout=30)
+TASK_ATTEMPTS = 3
+
+
+def load_checkpoint(path):
+    done = {}
+    if not os.path.exists(path):
+        return done
+
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                item = json.loads(line)
+            except ValueError:
+                # Последняя строка могла оборваться при аварийной остановке
+                continue
+            done[make_key(item['kind'], *item['parts'])] = item
+    return done
+
+
+def build_question_set(grade, subject, count):
+    questions = []
+    # Немного запаса на повторы и неудачные ответы модели
+    for _ in range(count * 2):
+        question = request_ai_question(grade, subject, breaker=warmup_breaker)
+        if not question and warmup_breaker.is_open():
+            return None
+        if question and '\n' not in question and question not in questions:
+            questions.append(question)
+            if len(questions) == count:
+                return QUESTION_SEPARATOR.join(questions)
+    # Неполный набор не сохраняем, чтобы следующий запуск сгенерировал его заново
+    return None
+
+
+def explanation_task(grade, topic):
+    try:
+        return request_explanation(topic, grade or None, breaker=warmup_breaker)
+    except Exception as e:
+        print(f"Explanation generation error ({topic}): {e}")
+        return None
+
+
+def recommendations_task(topic):
+    return request_recommendations(topic, breaker=warmup_breaker)
+
+
+def run_task(func, args):
+    for _ in range(TASK_ATTEMPTS):
+        value = func(*args)
+        if value:
+            return value
+        if warmup_breaker.is_open():
+            # Сервис недоступен - пережидаем, а не проваливаем задание сразу
+            time.sleep(warmup_breaker.reset_timeout)
+    return None
+
+
+def run_tasks(tasks, done, checkpoint, workers, failed):
+    pending = [task for task in tasks if make_key(task[0], *task[1]) not in done]
+    print(f"Tasks: {len(tasks)}, already done: {len(tasks) - len(pending)}")
+    if not pending:
+        return
+
+    started = time.time()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(run_task, func, args): (kind, parts) for kind, parts, func, args in pending}
+        for i, future in enumerate(as_completed(futures), 1):
+            kind, parts = futures[future]
+            value = future.result()
+            if not value:
+                failed.append((kind, parts))
+                print(f"[{i}/{len(pending)}] failed: {kind} {parts}")
+                continue
+
+            item = {'kind': kind, 'parts': list(parts), 'value': value}
+            done[make_key(kind, *parts)] = item
+            checkpoint.write(json.dumps(item, ensure_ascii=False) + '\n')
+            checkpoint.flush()
+            print(f"[{i}/{len(pending)}] {kind} {parts} ({time.time() - started:.0f} s)")
+
+
+def warm_up(grades, questions_per_subject, workers, checkpoint_path, output_path):
+    done = load_checkpoint(checkpoint_path)
+    failed = []
+
+    subjects = []
+    for grade in grades:
+        for subject in GRADE_SUBJECTS[grade]:
+            if subject not in subjects:
+                subjects.append(subject)
+
+    with open(checkpoint_path, 'a', encoding='utf-8') as checkpoint:
+        # Этап 1: вопросы для тестов, рекомендации и объяснения по предметам
+        tasks = []
+        for grade in grades:
+            for subject in GRADE_SUBJECTS[grade]:
+                tasks.append(('questions', (grade, subject), build_question_set,
+                              (grade, subject, questions_per_subject)))
+        for subject in subjects:
+            tasks.append(('recommendations', (subject,), recommendations_task, (subject,)))
+            tasks.append(('explanation', (0, subject), explanation_task, (0, subject)))
+        run_tasks(tasks, done, checkpoint, workers, failed)
+
+        # Этап 2: темы, которые бот предложит после теста
+        tasks = []
+        for grade in grades:
+            for subject in GRADE_SUBJECTS[grade]:
+                item = done.get(make_key('recommendations', subject))
+                if not item:
+                    continue
+                for topic in item['value'].split('_'):
+                    tasks.append(('explanation', (grade, topic), explanation_task, (grade, topic)))
+                    tasks.append(('recommendations', (topic,), recommendations_task, (topic,)))
+        run_tasks(list({make_key(t[0], *t[1]): t for t in tasks}.values()), done, checkpoint, workers, failed)
+
+    writer = ContentPackWriter()
+    for item in done.values():
+        writer.add(item['kind'], item['parts'], item['value'])
+    count = writer.write(output_path)
+    print(f"Content pack written: {output_path} ({count} entries, {os.path.getsize(output_path)} bytes)")
+
+    if failed:
+        print(f"Failed tasks: {len(failed)} (run warmup.py again to retry them)")
+        for kind, parts in failed:
+            print(f"  {kind} {parts}")
+
+
+def parse_grades(value):
+    if '-' in value:
+        first, last = value.split('-')
+        grades = list(range(int(first), int(last) + 1))
+    else:
+        grades = [int(grade) for grade in value.split(',')]
+
+    for grade in grades:
+        if grade not in GRADE_SUBJECTS:
+            raise argparse.ArgumentTypeError(f"Недопустимый класс: {grade}")
+    return grades
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Предварительная генерация контента для школьного помощника")
+    parser.add_argument('--grades', type=parse_grades, default=sorted(GRADE_SUBJECTS),
+                        help="классы, например 1-11 или 5,6,7")
+    parser.add_argument('--questions', type=int, default=10, help="вопросов на предмет")
+    parser.add_argument('--workers', type=int, default=4, help="одновременных запросов к API")
+    parser.add_argument('--checkpoint', default=CHECKPOINT_PATH)
+    parser.add_argument('--output', default=CONTENT_PACK_PATH)
+    args = parser.parse_args()
+
+    warm_up(args.grades, args.questions, args.workers, args.checkpoint, args.output)